@@ -7,22 +7,109 @@ Usage:
     python eval_all_epochs.py --model_dir output/th_rec_ppocr_v5-lr0001
     python eval_all_epochs.py --model_dir output/my_model
     python eval_all_epochs.py --model_dir output/my_model --config configs/my_config.yaml
+    python eval_all_epochs.py --model_dir output/my_model --jobs 4 --gpus 0,1,2,3
 """
 
 import os
 import subprocess
-import glob
-import re
 import argparse
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
 def get_epoch_number(filepath):
-    """Extract epoch number from filename for sorting."""
-    match = re.search(r'iter_epoch_(\d+)\.pdparams', filepath)
-    if match:
-        return int(match.group(1))
+    """Extract epoch number from an iter_epoch_<n>.pdparams filename for sorting."""
+    name = os.path.basename(filepath)
+    stem = name[:-len(".pdparams")] if name.endswith(".pdparams") else name
+    if "_" in stem:
+        suffix = stem.rsplit("_", 1)[1]
+        if suffix.isdigit():
+            return int(suffix)
     return 0
 
+def find_checkpoints(model_dir):
+    """
+    Scan model_dir once for iter_epoch_*.pdparams checkpoints.
+
+    Returns:
+        list: (epoch_number, path) tuples sorted by epoch number
+    """
+    checkpoints = []
+    with os.scandir(model_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith("iter_epoch_") and name.endswith(".pdparams"):
+                checkpoints.append((get_epoch_number(name), entry.path))
+    checkpoints.sort()
+    return checkpoints
+
+def parse_completed_epochs(log_file):
+    """
+    Collect epochs with a success marker in an existing sweep log.
+
+    Only epochs whose evaluation exited with code 0 get the marker, so a
+    failed or interrupted epoch is re-evaluated on resume.
+    """
+    done = set()
+    with open(log_file, "r", encoding="utf-8") as log:
+        for line in log:
+            line = line.strip()
+            if line.startswith("--- Epoch ") and line.endswith(" completed ---"):
+                epoch = line[len("--- Epoch "):-len(" completed ---")]
+                if epoch.isdigit():
+                    done.add(int(epoch))
+    return done
+
+def evaluate_checkpoint(model_path, cmd_prefix, gpu_queue, sink=None):
+    """
+    Run tools/eval.py for a single checkpoint, pinned to a free GPU.
+
+    Takes a GPU id from gpu_queue for the duration of the run and returns
+    it afterwards so another checkpoint can reuse that GPU.
+
+    Output is read line by line as the child produces it (stderr merged
+    into stdout so ordering is preserved). If sink is given, each line is
+    passed to it as it arrives; otherwise the lines are collected and
+    returned as one string.
+
+    Returns:
+        tuple: (returncode, combined output) of the evaluation process;
+               the output is '' when sink is used
+    """
+    gpu_id = gpu_queue.get()
+    try:
+        cmd = cmd_prefix + ["-o", f"Global.pretrained_model={model_path}"]
+
+        # A gpu_id of None means no explicit pinning; the child inherits
+        # whatever CUDA_VISIBLE_DEVICES the user exported
+        env = os.environ
+        if gpu_id is not None:
+            env = {**os.environ, "CUDA_VISIBLE_DEVICES": str(gpu_id)}
+
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            cwd=SCRIPT_DIR,
+            env=env
+        )
+
+        lines = []
+        for line in proc.stdout:
+            if sink is not None:
+                sink(line)
+            else:
+                lines.append(line)
+        returncode = proc.wait()
+
+        return returncode, "".join(lines)
+    finally:
+        gpu_queue.put(gpu_id)
+
 def main():
     parser = argparse.ArgumentParser(
         description="Evaluate all epoch checkpoints in a directory",
@@ -32,6 +119,7 @@ Examples:
   python eval_all_epochs.py --model_dir output/th_rec_ppocr_v5-lr0001
   python eval_all_epochs.py --model_dir output/my_model
   python eval_all_epochs.py --model_dir output/my_model --config configs/my_config.yaml
+  python eval_all_epochs.py --model_dir output/my_model --jobs 4 --gpus 0,1,2,3
         """
     )
     parser.add_argument(
@@ -53,6 +141,36 @@ Examples:
         default=None,
         help="Path to log file (default: <model_dir>/eval_all_epochs.log)"
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of evaluations to run concurrently (default: 1)"
+    )
+    parser.add_argument(
+        "--gpus",
+        type=str,
+        default=None,
+        help="Comma-separated GPU ids to use, one per job (default: 0..jobs-1)"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Append to an existing log and skip epochs it already contains"
+    )
+    parser.add_argument(
+        "--from_epoch",
+        type=int,
+        default=None,
+        help="Only evaluate epochs >= this number"
+    )
+    parser.add_argument(
+        "--to_epoch",
+        type=int,
+        default=None,
+        help="Only evaluate epochs <= this number"
+    )
 
     args = parser.parse_args()
 
@@ -76,21 +194,54 @@ Examples:
 
     log_file = args.log_file if args.log_file else os.path.join(model_dir, "eval_all_epochs.log")
 
-    # Find all iter_epoch_*.pdparams files
-    pattern = os.path.join(model_dir, "iter_epoch_*.pdparams")
-    model_files = glob.glob(pattern)
+    # Find all iter_epoch_*.pdparams files, sorted by epoch number
+    checkpoints = find_checkpoints(model_dir)
 
-    if not model_files:
-        print(f"❌ No model files found matching: {pattern}")
+    if not checkpoints:
+        print(f"❌ No model files found matching: {os.path.join(model_dir, 'iter_epoch_*.pdparams')}")
         print(f"Please check if the directory exists and contains iter_epoch_*.pdparams files")
         return
 
-    # Sort by epoch number
-    model_files.sort(key=get_epoch_number)
+    # Restrict the sweep to the requested epoch range
+    if args.from_epoch is not None:
+        checkpoints = [c for c in checkpoints if c[0] >= args.from_epoch]
+    if args.to_epoch is not None:
+        checkpoints = [c for c in checkpoints if c[0] <= args.to_epoch]
+
+    # On resume, skip epochs whose results are already in the log
+    if args.resume and os.path.exists(log_file):
+        done_epochs = parse_completed_epochs(log_file)
+        if done_epochs:
+            skipped = [c[0] for c in checkpoints if c[0] in done_epochs]
+            if skipped:
+                print(f"⏩ Resuming: skipping {len(skipped)} already-evaluated epoch(s)")
+            checkpoints = [c for c in checkpoints if c[0] not in done_epochs]
+
+    if not checkpoints:
+        print("✅ Nothing to evaluate: all requested epochs are already done")
+        return
+
+    # One GPU per concurrent job; checkpoints queue up on free GPUs.
+    # Without --gpus, a serial run leaves GPU selection entirely to the
+    # inherited environment, and a parallel run splits the exported
+    # CUDA_VISIBLE_DEVICES (falling back to 0..jobs-1 if unset).
+    if args.gpus:
+        gpu_ids = [g.strip() for g in args.gpus.split(',') if g.strip()]
+    elif args.jobs == 1:
+        gpu_ids = [None]
+    else:
+        visible = os.environ.get("CUDA_VISIBLE_DEVICES", "")
+        if visible:
+            gpu_ids = [g.strip() for g in visible.split(',') if g.strip()]
+        else:
+            gpu_ids = [str(i) for i in range(args.jobs)]
+    jobs = min(args.jobs, len(gpu_ids))
+    gpu_desc = "inherited from environment" if gpu_ids == [None] else ", ".join(gpu_ids)
 
     print(f"📁 Model directory: {model_dir}")
     print(f"📝 Config file: {config_file} {'(auto-detected)' if not args.config else ''}")
-    print(f"📊 Found {len(model_files)} model checkpoints to evaluate")
+    print(f"📊 Found {len(checkpoints)} model checkpoints to evaluate")
+    print(f"🚀 Running {jobs} evaluation(s) in parallel on GPU(s): {gpu_desc}")
     print(f"💾 Results will be saved to: {log_file}")
     print("=" * 60)
 
@@ -99,58 +250,105 @@ Examples:
     if log_dir and not os.path.exists(log_dir):
         os.makedirs(log_dir)
 
-    # Open log file
-    with open(log_file, "w", encoding="utf-8") as log:
+    # Built once; only the checkpoint-specific -o override varies per run
+    cmd_prefix = ["python", "tools/eval.py", "-c", config_file]
+
+    gpu_queue = queue.Queue()
+    for gpu_id in gpu_ids[:jobs]:
+        gpu_queue.put(gpu_id)
+
+    # Open log file with a 64 KiB buffer; flushed once per epoch block
+    # rather than per write, so an N-epoch sweep doesn't issue thousands
+    # of tiny write syscalls. On resume, append instead of truncating so
+    # completed epochs are kept.
+    log_mode = "a" if args.resume else "w"
+    with open(log_file, log_mode, buffering=1 << 16, encoding="utf-8") as log:
         # Write header
         log.write(f"Evaluation Results - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
         log.write(f"Config: {config_file}\n")
         log.write(f"Model Directory: {model_dir}\n")
         log.write("=" * 60 + "\n\n")
 
-        for i, model_path in enumerate(model_files, 1):
-            epoch_num = get_epoch_number(model_path)
-
-            print(f"\n[{i}/{len(model_files)}] Evaluating epoch {epoch_num}...")
+        def write_block_header(epoch_num, model_path):
             log.write(f"\n{'='*60}\n")
             log.write(f"Epoch: {epoch_num}\n")
             log.write(f"Model: {model_path}\n")
             log.write(f"{'='*60}\n")
-            log.flush()
-
-            # Build command
-            cmd = [
-                "python", "tools/eval.py",
-                "-c", config_file,
-                "-o", f"Global.pretrained_model={model_path}"
-            ]
-
-            # Run evaluation
-            try:
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    cwd=os.path.dirname(os.path.abspath(__file__))
-                )
-
-                # Write output to log
-                if result.stdout:
-                    log.write("\nSTDOUT:\n")
-                    log.write(result.stdout)
-                    print(result.stdout)
-
-                if result.stderr:
-                    log.write("\nSTDERR:\n")
-                    log.write(result.stderr)
-
-                log.write("\n")
-                log.flush()
-
-            except Exception as e:
-                error_msg = f"❌ Error evaluating {model_path}: {str(e)}\n"
-                print(error_msg)
-                log.write(error_msg)
-                log.flush()
+
+        def stream_line(line):
+            log.write(line)
+            print(line, end="")
+
+        if jobs == 1:
+            # Serial run: stream each line to the log and terminal as the
+            # child produces it, so progress is visible in real time and
+            # memory use stays constant regardless of output size
+            for i, (epoch_num, model_path) in enumerate(checkpoints, 1):
+                print(f"\n[{i}/{len(checkpoints)}] Evaluating epoch {epoch_num}...")
+                write_block_header(epoch_num, model_path)
+
+                try:
+                    returncode, _ = evaluate_checkpoint(
+                        model_path, cmd_prefix, gpu_queue, sink=stream_line
+                    )
+
+                    # The success marker is what --resume trusts, so it is
+                    # only written when the evaluation exited cleanly
+                    if returncode == 0:
+                        log.write(f"\n--- Epoch {epoch_num} completed ---\n")
+                    else:
+                        error_msg = f"❌ Epoch {epoch_num} failed (exit code {returncode})\n"
+                        print(error_msg, end="")
+                        log.write(f"\n{error_msg}")
+                    log.flush()
+
+                except Exception as e:
+                    error_msg = f"❌ Error evaluating {model_path}: {str(e)}\n"
+                    print(error_msg)
+                    log.write(error_msg)
+                    log.flush()
+        else:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                futures = {
+                    executor.submit(
+                        evaluate_checkpoint, model_path, cmd_prefix, gpu_queue
+                    ): (epoch_num, model_path)
+                    for epoch_num, model_path in checkpoints
+                }
+
+                # Flush each epoch's block as soon as its evaluation
+                # finishes; all log writes happen here in the main thread
+                # so per-epoch blocks stay contiguous.
+                for i, future in enumerate(as_completed(futures), 1):
+                    epoch_num, model_path = futures[future]
+
+                    print(f"\n[{i}/{len(checkpoints)}] Finished epoch {epoch_num}")
+                    write_block_header(epoch_num, model_path)
+
+                    try:
+                        returncode, output = future.result()
+
+                        # Write output to log
+                        if output:
+                            log.write("\nOUTPUT:\n")
+                            log.write(output)
+                            print(output)
+
+                        # The success marker is what --resume trusts, so it
+                        # is only written when the evaluation exited cleanly
+                        if returncode == 0:
+                            log.write(f"\n--- Epoch {epoch_num} completed ---\n")
+                        else:
+                            error_msg = f"❌ Epoch {epoch_num} failed (exit code {returncode})\n"
+                            print(error_msg, end="")
+                            log.write(f"\n{error_msg}")
+                        log.flush()
+
+                    except Exception as e:
+                        error_msg = f"❌ Error evaluating {model_path}: {str(e)}\n"
+                        print(error_msg)
+                        log.write(error_msg)
+                        log.flush()
 
     print("\n" + "=" * 60)
     print(f"✅ Evaluation complete! Results saved to: {log_file}")
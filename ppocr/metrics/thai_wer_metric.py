@@ -13,13 +13,36 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
 import os
 import sys
 import json
 import subprocess
-import tempfile
+import numpy as np
 from rapidfuzz.distance import Levenshtein
 
+# orjson is 2-5x faster than stdlib json for the all-non-ASCII Thai payloads
+# exchanged with the tokenizer; fall back to stdlib json if unavailable.
+# Both produce/accept UTF-8 JSON bytes, so the tokenizer side may use either.
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    _loads = json.loads
+
+# Whether this process was launched as tools/eval.py. Computed once at
+# import instead of materializing the whole call stack per metric instance.
+_IS_EVAL = os.path.basename(sys.argv[0]) == 'eval.py' or any(
+    'tools/eval.py' in a or 'tools\\eval.py' in a for a in sys.argv
+)
+
 
 class ThaiWERMetric(object):
     """
@@ -38,6 +61,8 @@ class ThaiWERMetric(object):
         engines (list): List of tokenizer engines to use (default: ["newmm", "attacut", "deepcut"])
                        Available: "newmm", "attacut", "deepcut"
         enabled (bool): Whether to enable WER calculation (default: True)
+        track_samples (bool): Keep per-sample WER values in self.wer_samples;
+                             only wer_totals drive get_metric (default: False)
     """
 
     def __init__(
@@ -47,11 +72,13 @@ class ThaiWERMetric(object):
         tokenizer_script=None,
         engines=None,
         enabled=True,
+        track_samples=False,
         **kwargs
     ):
         self.main_indicator = main_indicator
         self.python_path = python_path
         self.enabled = enabled
+        self.track_samples = track_samples
         self.eps = 1e-5
 
         # Default to all three engines if not specified
@@ -75,27 +102,91 @@ class ThaiWERMetric(object):
         else:
             self.tokenizer_script = tokenizer_script
 
-        # Check if we're running from tools/eval.py
-        self._check_if_eval_context()
+        # WER calculation only runs when called from tools/eval.py
+        if self.enabled and not _IS_EVAL:
+            self.enabled = False
+            print("[ThaiWERMetric] Not running from tools/eval.py - WER calculation disabled")
+
+        # Persistent tokenizer server process, started lazily on first use so
+        # pythainlp/attacut/deepcut are imported once instead of per batch
+        self._proc = None
+        self._server_failed = False
+
+        # Content-keyed tokenization cache: text -> {engine: tokens}.
+        # Reference labels repeat across batches (and are identical across
+        # epochs in a sweep), so each unique string is tokenized only once.
+        self._tok_cache = {}
 
         self.reset()
 
-    def _check_if_eval_context(self):
-        """Check if we're being called from tools/eval.py"""
-        # Check the call stack to see if eval.py is in the execution path
-        import traceback
-        stack = traceback.extract_stack()
+    def _ensure_server(self):
+        """
+        Start the tokenizer script in server mode if not already running.
 
-        is_eval = False
-        for frame in stack:
-            if 'tools/eval.py' in frame.filename.replace('\\', '/') or \
-               'tools\\eval.py' in frame.filename:
-                is_eval = True
-                break
+        The server imports the Thai NLP engines once and then tokenizes
+        batches sent over stdin/stdout, avoiding a full interpreter startup
+        (and deepcut model load) per batch.
 
-        if not is_eval:
-            self.enabled = False
-            print("[ThaiWERMetric] Not running from tools/eval.py - WER calculation disabled")
+        Returns:
+            Popen: Running server process, or None if it could not be started
+        """
+        if self._proc is not None and self._proc.poll() is None:
+            return self._proc
+
+        if self._server_failed:
+            return None
+
+        cmd = [
+            self.python_path,
+            self.tokenizer_script,
+            '--serve',
+            '--engines', ','.join(self.engines)
+        ]
+
+        try:
+            # Binary pipes: payloads are serialized to UTF-8 JSON bytes and
+            # flushed explicitly after each request. stderr is deliberately
+            # left unpiped so the server's log/error output flows straight
+            # to the parent's stderr and can never fill up a pipe buffer.
+            self._proc = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE
+            )
+            atexit.register(self._shutdown_server)
+
+            # The server warms its engines on startup (deepcut's model load
+            # takes hundreds of ms) and then sends "ready" as its first
+            # stdout line; block here so the first batch sees a primed
+            # server. EOF means it died during startup, with the reason
+            # already printed on the inherited stderr.
+            line = self._proc.stdout.readline()
+            if line.strip() != b'ready':
+                print("[ThaiWERMetric] Tokenizer server failed during startup (see error above)")
+                print("[ThaiWERMetric] Falling back to one-shot tokenization")
+                self._shutdown_server()
+                self._server_failed = True
+                return None
+
+            return self._proc
+        except Exception as e:
+            print(f"[ThaiWERMetric] Failed to start tokenizer server: {str(e)}")
+            print("[ThaiWERMetric] Falling back to one-shot tokenization")
+            self._server_failed = True
+            self._proc = None
+            return None
+
+    def _shutdown_server(self):
+        """Stop the tokenizer server process if it is running."""
+        if self._proc is None:
+            return
+        try:
+            if self._proc.poll() is None:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=10)
+        except Exception:
+            self._proc.kill()
+        self._proc = None
 
     def _tokenize_batch(self, texts):
         """
@@ -121,50 +212,92 @@ class ThaiWERMetric(object):
             self.enabled = False
             return None
 
+        # Only send strings not seen before; serve the rest from the cache
+        seen = set()
+        misses = []
+        for text in texts:
+            if text not in self._tok_cache and text not in seen:
+                seen.add(text)
+                misses.append(text)
+
+        if misses:
+            tokenized = self._tokenize_uncached(misses)
+            if tokenized is None:
+                return None
+
+            # The tokenizer's error path replies with empty lists whatever
+            # the batch size; treat any length mismatch as a failed batch
+            # instead of indexing past the end
+            if any(
+                len(tokenized.get(eng, [])) != len(misses)
+                for eng in self.engines
+            ):
+                print("[ThaiWERMetric] Tokenizer returned incomplete results; skipping batch")
+                return None
+
+            for i, text in enumerate(misses):
+                self._tok_cache[text] = {
+                    eng: tokenized[eng][i] for eng in self.engines
+                }
+
+        return {
+            eng: [self._tok_cache[text][eng] for text in texts]
+            for eng in self.engines
+        }
+
+    def _tokenize_uncached(self, texts):
+        """Tokenize texts that were not found in the cache."""
+        proc = self._ensure_server()
+        if proc is None:
+            return self._tokenize_batch_oneshot(texts)
+
+        try:
+            proc.stdin.write(_dumps({'texts': texts}) + b'\n')
+            proc.stdin.flush()
+
+            line = proc.stdout.readline()
+            if not line:
+                raise RuntimeError("tokenizer server closed its stdout")
+
+            return _loads(line)
+
+        except Exception as e:
+            print(f"[ThaiWERMetric] Tokenization error: {str(e)}")
+            self._shutdown_server()
+            return None
+
+    def _tokenize_batch_oneshot(self, texts):
+        """
+        Tokenize a batch by spawning the tokenizer script once per call.
+
+        Fallback path used when the persistent server could not be started.
+        Texts are passed over stdin/stdout pipes instead of temp files, so
+        no filesystem round-trip is needed per batch.
+        """
         try:
-            # Create temporary input file
-            with tempfile.NamedTemporaryFile(
-                mode='w', encoding='utf-8', delete=False, suffix='.json'
-            ) as f:
-                input_file = f.name
-                json.dump({'texts': texts}, f, ensure_ascii=False)
-
-            # Create temporary output file
-            with tempfile.NamedTemporaryFile(
-                mode='w', encoding='utf-8', delete=False, suffix='.json'
-            ) as f:
-                output_file = f.name
-
-            # Run tokenizer script with specified engines
+            # Run tokenizer script with specified engines, piping the batch
+            # through stdin/stdout
             cmd = [
                 self.python_path,
                 self.tokenizer_script,
-                '--input', input_file,
-                '--output', output_file,
+                '--input', '-',
+                '--output', '-',
                 '--engines', ','.join(self.engines)
             ]
 
             result = subprocess.run(
                 cmd,
+                input=_dumps({'texts': texts}),
                 capture_output=True,
-                text=True,
                 timeout=60
             )
 
             if result.returncode != 0:
                 print(f"[ThaiWERMetric] Tokenizer script failed:")
-                print(f"STDERR: {result.stderr}")
+                print(f"STDERR: {result.stderr.decode('utf-8', 'replace')}")
                 return None
 
-            # Read results
-            with open(output_file, 'r', encoding='utf-8') as f:
-                results = json.load(f)
-
-            # Cleanup
-            os.unlink(input_file)
-            os.unlink(output_file)
-
-            return results
+            return _loads(result.stdout)
 
         except subprocess.TimeoutExpired:
             print("[ThaiWERMetric] Tokenization timeout")
@@ -186,12 +319,8 @@ class ThaiWERMetric(object):
         Returns:
             float: WER score
         """
-        if len(target_tokens) == 0:
-            return 0.0 if len(pred_tokens) == 0 else 1.0
-
-        # Convert token lists to strings for Levenshtein distance
-        pred_str = ' '.join(pred_tokens)
-        target_str = ' '.join(target_tokens)
+        if not target_tokens:
+            return 0.0 if not pred_tokens else 1.0
 
         # Calculate Levenshtein distance on word level
         distance = Levenshtein.distance(pred_tokens, target_tokens)
@@ -223,29 +352,86 @@ class ThaiWERMetric(object):
         pred_texts = [pred for pred, _ in preds]
         label_texts = [label for label, _ in labels]
 
-        # Tokenize predictions and labels
-        pred_tokenized = self._tokenize_batch(pred_texts)
-        label_tokenized = self._tokenize_batch(label_texts)
+        all_num = len(preds)
 
-        if pred_tokenized is None or label_tokenized is None:
-            result = {f"wer_{eng}": 0.0 for eng in self.engines}
-            result["wer_avg"] = 0.0
-            return result
+        # Fast path: an exact match has WER 0 under every tokenizer, and a
+        # pair with one empty side has WER 1, so neither needs tokenization.
+        # Only genuinely mismatched non-empty pairs go to the tokenizer.
+        mismatch_idx = []
+        fixed_wers = {}
+        for i, (p, l) in enumerate(zip(pred_texts, label_texts)):
+            if p == l:
+                continue
+            if not p or not l:
+                fixed_wers[i] = 1.0
+            else:
+                mismatch_idx.append(i)
+
+        if mismatch_idx:
+            # Tokenize predictions and labels in a single round-trip: send
+            # one combined batch and split the result, halving IPC overhead
+            n = len(mismatch_idx)
+            combined = self._tokenize_batch(
+                [pred_texts[i] for i in mismatch_idx]
+                + [label_texts[i] for i in mismatch_idx]
+            )
+
+            if combined is None:
+                result = {f"wer_{eng}": 0.0 for eng in self.engines}
+                result["wer_avg"] = 0.0
+                return result
+
+            pred_tokenized = {eng: combined[eng][:n] for eng in self.engines}
+            label_tokenized = {eng: combined[eng][n:] for eng in self.engines}
+
+        fixed_sum = sum(fixed_wers.values())
 
         # Calculate WER for each enabled tokenizer
         batch_wer = {}
-        all_num = len(preds)
 
         for tokenizer in self.engines:
-            wer_sum = 0.0
-            for i in range(all_num):
-                pred_tokens = pred_tokenized[tokenizer][i]
-                label_tokens = label_tokenized[tokenizer][i]
-                wer = self._calculate_wer(pred_tokens, label_tokens)
-                wer_sum += wer
-
-                # Store per-sample WER
-                self.wer_samples[tokenizer].append(wer)
+            wer_sum = fixed_sum
+
+            if mismatch_idx:
+                tok_preds = pred_tokenized[tokenizer]
+                tok_labels = label_tokenized[tokenizer]
+
+                # Distances stay in rapidfuzz's C implementation; the
+                # division and summation happen in one NumPy pass instead
+                # of per sample
+                distances = np.fromiter(
+                    (
+                        Levenshtein.distance(p, l)
+                        for p, l in zip(tok_preds, tok_labels)
+                    ),
+                    dtype=np.int64,
+                    count=len(mismatch_idx)
+                )
+                ref_lens = np.fromiter(
+                    (len(l) for l in tok_labels),
+                    dtype=np.int64,
+                    count=len(mismatch_idx)
+                )
+                wers = distances / np.maximum(ref_lens, 1)
+
+                # Empty reference: WER is 0 for an empty prediction, 1
+                # otherwise (same convention as _calculate_wer)
+                empty = ref_lens == 0
+                if empty.any():
+                    wers[empty] = (distances[empty] > 0).astype(np.float64)
+
+                wer_sum += float(wers.sum())
+
+            # Per-sample WER tracking is opt-in; only the running totals
+            # feed get_metric
+            if self.track_samples:
+                sample_wers = [0.0] * all_num
+                for i, wer in fixed_wers.items():
+                    sample_wers[i] = wer
+                if mismatch_idx:
+                    for j, i in enumerate(mismatch_idx):
+                        sample_wers[i] = float(wers[j])
+                self.wer_samples[tokenizer].extend(sample_wers)
 
             batch_wer[tokenizer] = wer_sum / (all_num + self.eps)
             self.wer_totals[tokenizer] += wer_sum
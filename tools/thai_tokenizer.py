@@ -10,8 +10,13 @@ It tokenizes Thai text using three different tokenizers:
 - deepcut
 
 Usage:
+    # One-shot mode
     python thai_tokenizer.py --input input.json --output output.json
 
+    # Server mode: import engines once, then serve batches over stdin/stdout
+    # as newline-delimited JSON ({"texts": [...]} in, tokenization dict out)
+    python thai_tokenizer.py --serve --engines newmm,attacut,deepcut
+
 Input JSON format:
     {
         "texts": ["text1", "text2", ...]
@@ -31,51 +36,107 @@ Requirements (install in separate environment):
 import sys
 import json
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# orjson is 2-5x faster than stdlib json on the all-non-ASCII Thai payloads;
+# fall back to stdlib json if it is not installed. Both emit/accept UTF-8
+# JSON bytes so either side of the pipe can use either library.
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    _loads = json.loads
+
+# Engine packages are imported once at module load instead of on every
+# tokenization call; a missing package is only an error if its engine is
+# actually requested (see check_engines).
+try:
+    from pythainlp.tokenize import word_tokenize
+except ImportError:
+    word_tokenize = None
+
+try:
+    import attacut
+except ImportError:
+    attacut = None
+
+try:
+    import deepcut
+except ImportError:
+    deepcut = None
+
+# The attacut engine runs through pythainlp's word_tokenize but also needs
+# the attacut package itself, so it depends on both
+_ENGINE_PACKAGES = {
+    'newmm': (('pythainlp', word_tokenize),),
+    'attacut': (('pythainlp', word_tokenize), ('attacut', attacut)),
+    'deepcut': (('deepcut', deepcut),),
+}
+
+
+def check_engines(engines):
+    """Exit with one message listing every missing package for the requested engines."""
+    missing = []
+    for engine in engines:
+        for package, module in _ENGINE_PACKAGES.get(engine, ()):
+            if module is None and package not in missing:
+                missing.append(package)
+
+    if missing:
+        print(
+            f"Error: {', '.join(missing)} not installed. "
+            f"Please install: pip install {' '.join(missing)}",
+            file=sys.stderr
+        )
+        sys.exit(1)
 
 
-def tokenize_with_newmm(text):
-    """Tokenize using PyThaiNLP newmm tokenizer."""
+def tokenize_with_newmm(texts):
+    """Tokenize a batch of texts using PyThaiNLP newmm tokenizer."""
     try:
-        from pythainlp.tokenize import word_tokenize
-        return word_tokenize(text, engine='newmm')
-    except ImportError:
-        print("Error: pythainlp not installed. Please install: pip install pythainlp", file=sys.stderr)
-        sys.exit(1)
+        return [word_tokenize(text, engine='newmm') for text in texts]
     except Exception as e:
         print(f"Error in newmm tokenization: {str(e)}", file=sys.stderr)
-        return []
+        return [[] for _ in texts]
 
 
-def tokenize_with_attacut(text):
-    """Tokenize using PyThaiNLP attacut tokenizer."""
+def tokenize_with_attacut(texts):
+    """Tokenize a batch of texts using PyThaiNLP attacut tokenizer."""
     try:
-        from pythainlp.tokenize import word_tokenize
-        return word_tokenize(text, engine='attacut')
-    except ImportError:
-        print("Error: attacut not installed. Please install: pip install attacut", file=sys.stderr)
-        sys.exit(1)
+        return [word_tokenize(text, engine='attacut') for text in texts]
     except Exception as e:
         print(f"Error in attacut tokenization: {str(e)}", file=sys.stderr)
-        return []
+        return [[] for _ in texts]
 
 
-def tokenize_with_deepcut(text):
-    """Tokenize using deepcut tokenizer."""
+def tokenize_with_deepcut(texts):
+    """Tokenize a batch of texts using deepcut tokenizer."""
     try:
-        import deepcut
-        return deepcut.tokenize(text)
-    except ImportError:
-        print("Error: deepcut not installed. Please install: pip install deepcut", file=sys.stderr)
-        sys.exit(1)
+        if not texts:
+            return []
+        # deepcut.tokenize accepts a list of texts and runs one batched
+        # TF inference instead of rebuilding the input tensor per text
+        return deepcut.tokenize(texts)
     except Exception as e:
         print(f"Error in deepcut tokenization: {str(e)}", file=sys.stderr)
-        return []
+        return [[] for _ in texts]
 
 
 def tokenize_batch(texts, engines=None):
     """
     Tokenize a batch of texts using specified tokenizers.
 
+    The engines run concurrently in a thread pool: deepcut (TensorFlow) and
+    attacut (PyTorch) release the GIL during inference, so the wall time per
+    batch is bounded by the slowest engine rather than their sum.
+
     Args:
         texts (list): List of text strings to tokenize
         engines (list): List of engine names to use (default: all three)
@@ -93,20 +154,65 @@ def tokenize_batch(texts, engines=None):
         'deepcut': tokenize_with_deepcut
     }
 
-    results = {eng: [] for eng in engines}
+    results = {}
+    known = [eng for eng in engines if eng in engine_funcs]
+
+    for engine in engines:
+        if engine not in engine_funcs:
+            print(f"Warning: Unknown engine '{engine}', skipping", file=sys.stderr)
+            results[engine] = [[] for _ in texts]
 
-    for text in texts:
-        # Tokenize with each specified engine
-        for engine in engines:
-            if engine in engine_funcs:
-                results[engine].append(engine_funcs[engine](text))
-            else:
-                print(f"Warning: Unknown engine '{engine}', skipping", file=sys.stderr)
-                results[engine].append([])
+    if known:
+        with ThreadPoolExecutor(max_workers=len(known)) as executor:
+            futures = {
+                executor.submit(engine_funcs[eng], texts): eng for eng in known
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
 
     return results
 
 
+def serve(engines):
+    """
+    Run as a long-lived tokenization server.
+
+    Reads newline-delimited JSON requests ({"texts": [...]}) from stdin and
+    writes one newline-delimited JSON result per request to stdout, so the
+    engines are imported (and their models loaded) only once per process.
+    The first stdout line is a "ready" handshake sent once the engines are
+    warm; everything after it is one JSON result per request. stderr is
+    reserved for human-readable logging and error messages.
+    """
+    print(f"Serving engines: {', '.join(engines)}", file=sys.stderr)
+
+    # Warm lazy engine initialization (deepcut builds its Keras/TF graph
+    # and attacut loads its weights on first use) so the first real batch
+    # doesn't pay the startup cost, then tell the parent we are primed
+    known = [eng for eng in engines if eng in _ENGINE_PACKAGES]
+    if known:
+        tokenize_batch(["ก"], known)
+    sys.stdout.buffer.write(b'ready\n')
+    sys.stdout.buffer.flush()
+
+    # Binary pipes: orjson produces/consumes bytes directly, avoiding a
+    # decode/encode round-trip per request
+    for line in sys.stdin.buffer:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            request = _loads(line)
+            results = tokenize_batch(request.get('texts', []), engines)
+        except Exception as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            results = {eng: [] for eng in engines}
+
+        sys.stdout.buffer.write(_dumps(results) + b'\n')
+        sys.stdout.buffer.flush()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Tokenize Thai text using specified tokenizers'
@@ -114,14 +220,19 @@ def main():
     parser.add_argument(
         '--input',
         type=str,
-        required=True,
-        help='Input JSON file containing texts to tokenize'
+        default=None,
+        help="Input JSON file containing texts to tokenize ('-' for stdin)"
     )
     parser.add_argument(
         '--output',
         type=str,
-        required=True,
-        help='Output JSON file for tokenization results'
+        default=None,
+        help="Output JSON file for tokenization results ('-' for stdout)"
+    )
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='Run as a persistent server reading/writing JSON lines on stdin/stdout'
     )
     parser.add_argument(
         '--engines',
@@ -138,11 +249,23 @@ def main():
         if not engines:
             engines = ['newmm', 'attacut', 'deepcut']
 
+        check_engines(engines)
+
+        if args.serve:
+            serve(engines)
+            return
+
+        if not args.input or not args.output:
+            parser.error('--input and --output are required unless --serve is used')
+
         print(f"Using engines: {', '.join(engines)}", file=sys.stderr)
 
         # Read input
-        with open(args.input, 'r', encoding='utf-8') as f:
-            input_data = json.load(f)
+        if args.input == '-':
+            input_data = json.load(sys.stdin)
+        else:
+            with open(args.input, 'r', encoding='utf-8') as f:
+                input_data = json.load(f)
 
         texts = input_data.get('texts', [])
 
@@ -154,8 +277,12 @@ def main():
             results = tokenize_batch(texts, engines)
 
         # Write output
-        with open(args.output, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        if args.output == '-':
+            json.dump(results, sys.stdout, ensure_ascii=False)
+            sys.stdout.write('\n')
+        else:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
 
         print(f"Successfully tokenized {len(texts)} texts with {len(engines)} engine(s)", file=sys.stderr)
 